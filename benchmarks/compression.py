@@ -0,0 +1,92 @@
+"""Compare size, save and load time of plain, gzip and xz task files.
+
+Usage:
+    python benchmarks/compression.py [--tasks 50000] [--desc-length 60]
+"""
+import argparse
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+from gitodo.tasks import Task, Task_List, Tasks
+
+SUFFIXES = ("", ".gz", ".xz")
+
+
+def random_str(length: int) -> str:
+    return "".join(random.choices(string.ascii_letters + " ", k=length))
+
+
+def random_task_list(num_tasks: int, desc_length: int) -> Task_List:
+    """Random tasks in a few categories, some without category or due date
+
+    Args:
+        num_tasks : number of tasks
+        desc_length : length of the descriptions
+
+    Returns:
+        Task_List object
+    """
+    cats = [None, "work", "home", "shopping", "garden"]
+    todos = [
+        Task(
+            name=random_str(12),
+            desc=random_str(desc_length),
+            cat=random.choice(cats),
+            deadline=random.choice([None, f"2021-{random.randint(1, 12):02}-01"]),
+        )
+        for _ in range(num_tasks)
+    ]
+    return Task_List(todos=todos)
+
+
+def measure(path: Path, tasks: Task_List) -> Tuple[float, float, float]:
+    """Save and load the tasks once
+
+    Args:
+        path : task file
+        tasks : Task_List object
+
+    Returns:
+        size in MB, save and load time in seconds
+    """
+    task_file = Tasks(path=path, tasks=tasks)
+    start = time.perf_counter()
+    task_file.save()
+    save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Tasks.from_file(path)
+    load_time = time.perf_counter() - start
+
+    return path.stat().st_size / 1e6, save_time, load_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--desc-length", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    tasks = random_task_list(args.tasks, args.desc_length)
+
+    print(f"{args.tasks} tasks, {args.desc_length} char descriptions\n")
+    print(f"{'format':8}{'size':>10}{'save':>9}{'load':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for suffix in SUFFIXES:
+            (size, save_time, load_time) = measure(
+                Path(tmp_dir) / f".gitodo{suffix}", tasks
+            )
+            print(
+                f"{suffix or 'plain':8}{size:>7.2f} MB"
+                f"{save_time:>7.2f} s{load_time:>7.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,57 @@
 #!/usr/bin/python
 
-from typing import Optional
+from typing import List, Optional
 
 import typer
 
-from gitodo.tasks import TASKS_PATH, Task, Tasks
+from gitodo.completion import (TASKS_FILE_ENV, TASKS_PATH, complete_cat,
+                               complete_hash, complete_name,
+                               completion_index_path, find_task_file)
 
+# gitodo.tasks is imported inside the commands, so the shell completion only
+# has to load gitodo.completion
 app = typer.Typer()
+# task file of the current call, resolved once for every command
+state = {"file": TASKS_PATH}
+
+
+@app.callback()
+def main(
+    file: Optional[str] = typer.Option(
+        None,
+        "--file",
+        "-f",
+        help=f"Task file. Defaults to ${TASKS_FILE_ENV} or the first existing"
+        " .gitodo, .gitodo.gz, .gitodo.xz or .gitodo.db",
+    ),
+):
+    """A cli todo program with a human readable format (json)"""
+    state["file"] = find_task_file(file)
 
 
 @app.command("init")
-def init_task_file(path: str = typer.Argument(str(TASKS_PATH))):
-    tasks = Tasks(path)
+def init_task_file(path: Optional[str] = typer.Argument(None)):
+    from gitodo.tasks import Tasks
+
+    tasks = Tasks(path or state["file"])
     tasks.save()
 
     typer.echo("Created new tasks file")
+    typer.echo(
+        f"Add {completion_index_path(tasks.path).name} to your .gitignore,"
+        " it caches the shell completion"
+    )
 
 
 @app.command("add", help="Add a task to the list")
 def add_task(
     name: str = typer.Argument("name"),
     desc: str = typer.Argument("desc"),
-    cat: Optional[str] = typer.Option(None, "--cat", "-c"),
+    cat: Optional[str] = typer.Option(None, "--cat", "-c", autocompletion=complete_cat),
     deadline: Optional[str] = typer.Option(None, "--deadline", "-d"),
+    blocked_by: List[str] = typer.Option(
+        [], "--blocked-by", "-b", autocompletion=complete_hash
+    ),
 ):
     """Add a task
 
@@ -33,13 +62,23 @@ def add_task(
     cat (Optional) : A category. Used for grouping.
 
     deadline (Optional) : A duedate. Use the iso format.
+
+    blocked_by (Optional) : Hash or part of the hash of a blocking task.
+    Can be used multiple times.
     """
     command_args = {k: v for (k, v) in locals().items() if v is not None}
+    command_args.pop("blocked_by")
+    from gitodo.tasks import Task, Tasks
+
     if command_args == {"name": "name", "desc": "desc"}:
         typer.echo("Default arguments, no task was created")
     else:
         try:
-            with Tasks.from_file() as tasks:
+            with Tasks.from_file(state["file"]) as tasks:
+                blockers = [tasks.find_task(task_hash=h).to_list() for h in blocked_by]
+                if any(len(matches) != 1 for matches in blockers):
+                    raise ValueError("No specific blocking task could be found")
+                command_args["blocked_by"] = [m[0].to_hash() for m in blockers]
                 tasks.add_task(Task(**command_args))
             typer.echo("Added task ")
 
@@ -50,25 +89,40 @@ def add_task(
                 err = True
             )
 
+        except ValueError as ve:
+            typer.echo(message=str(ve), err=True)
+
 
 @app.command("get", help="Get specific task")
 def get_task(
-    name: Optional[str] = typer.Option(None, "--name", "-n"),
-    partial_hash: Optional[str] = typer.Option(None, "--partial-hash", "-h"),
+    name: Optional[str] = typer.Option(
+        None, "--name", "-n", autocompletion=complete_name
+    ),
+    partial_hash: Optional[str] = typer.Option(
+        None, "--partial-hash", "-h", autocompletion=complete_hash
+    ),
+    limit: Optional[int] = typer.Option(None, "--limit", "-l", min=0),
+    offset: int = typer.Option(0, "--offset", "-o", min=0),
 ):
     """Filter the task by name or partial hash
 
     name : Name of the task.
     partial_hash: Hash or part of hash to filter by
+    limit : Maximum number of matches to print
+    offset : Number of matches to skip
 
     """
     if not name and not partial_hash:
         typer.echo("You have to supply a name and/or a partial hash")
     else:
+        from gitodo.tasks import Tasks
+
         try:
-            task = Tasks.from_file().find_task(task_hash=partial_hash, task_name=name)
+            task = Tasks.from_file(state["file"]).find_task(
+                task_hash=partial_hash, task_name=name
+            )
             if task:
-                task.to_console()
+                task.to_console(offset=offset, limit=limit)
 
         except ValueError as ve:
             print(ve)
@@ -76,8 +130,12 @@ def get_task(
 
 @app.command("finish")
 def finish_task(
-    task_hash: Optional[str] = typer.Option(None, "--hash", "-h"),
-    task_name: Optional[str] = typer.Option(None, "--name", "-n"),
+    task_hash: Optional[str] = typer.Option(
+        None, "--hash", "-h", autocompletion=complete_hash
+    ),
+    task_name: Optional[str] = typer.Option(
+        None, "--name", "-n", autocompletion=complete_name
+    ),
 ):
     """Finish a task and remove it from the list
 
@@ -85,15 +143,106 @@ def finish_task(
     name : name of task
     """
     command_args = {k: v for (k, v) in locals().items() if v is not None}
-    with Tasks.from_file() as tasks:
+    from gitodo.tasks import Tasks
+
+    with Tasks.from_file(state["file"]) as tasks:
         tasks.finish_task(**command_args)
 
 
 @app.command("list")
 def list_all_tasks(
-    cat: Optional[str] = typer.Option(None, "--cat", "-c"),
+    cat: Optional[str] = typer.Option(None, "--cat", "-c", autocompletion=complete_cat),
+    limit: Optional[int] = typer.Option(None, "--limit", "-l", min=0),
+    offset: int = typer.Option(0, "--offset", "-o", min=0),
+):
+    """List the tasks ordered by category and due date
+
+    cat : category to filter by
+    limit : Maximum number of tasks to print
+    offset : Number of tasks to skip
+    """
+    from gitodo.tasks import Tasks
+
+    if limit is None:
+        Tasks.from_file(state["file"]).print(cat, offset=offset)
+    else:
+        # a page is read in the saved order, without loading every task
+        try:
+            Tasks.page_from_file(
+                state["file"], offset=offset, limit=limit, cat=cat
+            ).to_console(keep_order=True)
+        except ValueError as ve:
+            print(ve)
+
+
+@app.command("next", help="List the tasks that are not blocked")
+def list_next_tasks(
+    limit: Optional[int] = typer.Option(None, "--limit", "-l", min=0),
 ):
-    Tasks.from_file().print(cat)
+    """List the tasks without open dependencies ordered by due date
+
+    limit : Maximum number of tasks to print
+    """
+    from gitodo.tasks import Tasks
+
+    try:
+        tasks = Tasks.from_file(state["file"])
+        tasks.next_tasks(limit=limit).to_console(keep_order=True)
+
+    except ValueError as ve:
+        print(ve)
+
+
+@app.command("stats", help="Show statistics of the task file")
+def show_stats(
+    memory: bool = typer.Option(False, "--memory", "-m"),
+):
+    """Print the number of tasks and categories
+
+    memory : Also measure the memory used by the loaded tasks
+    """
+    from gitodo.tasks import Tasks, measure_memory
+
+    if memory:
+        tasks, size = measure_memory(state["file"])
+    else:
+        tasks = Tasks.from_file(state["file"])
+
+    num_tasks = len(tasks)
+    typer.echo(f"Tasks      : {num_tasks}")
+    categories = [cat for cat in tasks.categories() if cat != "_"]
+    typer.echo(f"Categories : {len(categories)}")
+    if memory:
+        typer.echo(f"Memory     : {size} bytes")
+        if num_tasks:
+            typer.echo(f"Per task   : {size // num_tasks} bytes")
+
+
+@app.command("migrate", help="Convert the task file between json and sqlite")
+def migrate_tasks(
+    source: Optional[str] = typer.Argument(None),
+    destination: str = typer.Argument(...),
+):
+    """Copy all tasks into a new file
+
+    source : Task file to read from. Defaults to the task file.
+
+    destination : New task file. Suffixes .db, .sqlite and .sqlite3 create a
+    sqlite database, everything else a json file.
+    """
+    from gitodo.tasks import Tasks
+
+    source = source or str(state["file"])
+    try:
+        tasks = Tasks.from_file(source)
+        tasks.migrate(destination)
+        typer.echo(f"Migrated {len(tasks)} tasks to {destination}")
+
+    except FileNotFoundError:
+        typer.echo(message=f"Task file {source} does not exist", err=True)
+
+    except FileExistsError as fe:
+        typer.echo(message=str(fe), err=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+"""Shell completion for task hashes, names and categories.
+
+The shell calls the completion callbacks on every keypress, so this module
+only uses the standard library and click and reads a small index that is
+written next to the task file whenever the tasks are saved. The index is a
+cache and should not be committed, add "*.complete" to the .gitignore of the
+repository that holds the task file.
+
+The task file is resolved here as well, so the commands and the completion
+always use the same file.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import click
+
+# default task file, defined here so the completion needs no gitodo.tasks import
+TASKS_PATH = Path(".gitodo")
+# existing task files that are used when no file is given, in this order
+TASKS_CANDIDATES = (
+    TASKS_PATH,
+    Path(".gitodo.gz"),
+    Path(".gitodo.xz"),
+    Path(".gitodo.db"),
+)
+TASKS_FILE_ENV = "GITODO_FILE"
+COMPLETION_SUFFIX = ".complete"
+
+
+def find_task_file(path: Optional[Union[Path, str]] = None) -> Path:
+    """Resolve the task file. A given path is used as is, otherwise the
+        GITODO_FILE environment variable or the first existing file of
+        TASKS_CANDIDATES.
+
+    Args:
+        path : path of the task file. Defaults to None.
+
+    Returns:
+        path of the task file, .gitodo if no file exists yet
+    """
+    if path:
+        return Path(path)
+    if os.environ.get(TASKS_FILE_ENV):
+        return Path(os.environ[TASKS_FILE_ENV])
+    for candidate in TASKS_CANDIDATES:
+        if candidate.exists():
+            return candidate
+
+    return TASKS_PATH
+
+
+def completion_index_path(path: Path = TASKS_PATH) -> Path:
+    """Path of the completion index that belongs to a task file
+
+    Args:
+        path : path of the task file
+
+    Returns:
+        path of the index
+    """
+    return path.with_name(f"{path.name}{COMPLETION_SUFFIX}")
+
+
+def write_completion_index(
+    path: Path,
+    hashes: Iterable[str],
+    names: Iterable[str],
+    cats: Iterable[str],
+) -> None:
+    """Write the completion candidates for a task file
+
+    Args:
+        path : path of the task file
+        hashes : task hashes
+        names : task names
+        cats : task categories
+    """
+    index_path = completion_index_path(path)
+    index = {
+        "hashes": sorted(set(hashes)),
+        "names": sorted(set(names)),
+        "cats": sorted(set(cats)),
+    }
+    tmp_path = index_path.with_name(f"{index_path.name}.tmp")
+    with open(tmp_path, "w") as index_file:
+        json.dump(index, index_file, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+
+
+def _read_index(path: Optional[Union[Path, str]] = None) -> Dict[str, List[str]]:
+    try:
+        with open(completion_index_path(find_task_file(path)), "r") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _complete(ctx: click.Context, key: str, incomplete: str) -> List[str]:
+    # the global --file option is parsed before the completion is called
+    path = ctx.find_root().params.get("file")
+    return [c for c in _read_index(path).get(key, []) if c.startswith(incomplete)]
+
+
+def complete_hash(ctx: click.Context, incomplete: str) -> List[str]:
+    return _complete(ctx, "hashes", incomplete)
+
+
+def complete_name(ctx: click.Context, incomplete: str) -> List[str]:
+    return _complete(ctx, "names", incomplete)
+
+
+def complete_cat(ctx: click.Context, incomplete: str) -> List[str]:
+    return _complete(ctx, "cats", incomplete)
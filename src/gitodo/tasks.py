@@ -1,25 +1,69 @@
+import gzip
+import heapq
+import io
 import json
+import lzma
+import re
+import sqlite3
+import sys
+import tracemalloc
+from abc import ABC, abstractmethod
 from datetime import date, datetime
 from hashlib import sha256
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import (IO, Callable, Dict, Iterator, List, Optional, Set, Tuple,
+                    Union)
 
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from termcolor import colored
 
+from gitodo.completion import (TASKS_PATH, find_task_file,
+                               write_completion_index)
+
 
 class Task(BaseModel):
     name: str
     desc: str
     cat: Optional[str] = None
     deadline: Optional[date] = None
+    blocked_by: List[str] = []
+
+    @validator("cat")
+    def empty_cat_to_none(cls, cat: Optional[str]) -> Optional[str]:
+        # an empty category means no category in every backend
+        return cat or None
 
     def to_hash(self) -> str:
+        # dependencies are not part of the identity of a task
         return sha256(
-            json.dumps(self.dict(), sort_keys=True, default=str).encode("utf-8")
+            json.dumps(
+                self.dict(exclude={"blocked_by"}), sort_keys=True, default=str
+            ).encode("utf-8")
         ).hexdigest()[:10]
 
 
+def _order_key(task: Task) -> Tuple:
+    """Sort key used for ordering tasks
+
+    Tasks with a category come first, grouped by category. Tasks without a
+    category follow, ordered by due date.
+
+    Args:
+        task : Task object
+
+    Returns:
+        key tuple
+    """
+    if task.cat:
+        return (0, task.cat, task.deadline is None, date.min)
+    return (1, "", task.deadline is None, task.deadline or date.min)
+
+
+def _deadline_key(task: Task) -> Tuple:
+    return (task.deadline is None, task.deadline or date.min)
+
+
 class Task_List(BaseModel):
     todos: List[Task]
 
@@ -32,109 +76,273 @@ class Task_List(BaseModel):
     def __len__(self):
         return len(self.todos)
 
-    def _hash_dict(self) -> Dict[str, Dict[str, Dict]]:
-        """Create hash for every task that functions as key
+    def to_console(
+        self,
+        cat: Optional[str] = "",
+        offset: int = 0,
+        limit: Optional[int] = None,
+        keep_order: bool = False,
+    ) -> None:
+        """Generate a colorcoded terminal output of the tasks
 
         Args:
-            tasks : listed tasks
+            cat : category to filter by
+            offset : number of ordered tasks to skip
+            limit : maximum number of tasks to print. Defaults to all.
+            keep_order : print the tasks in list order, e.g. if they are
+                already ordered
+        """
+        if offset or limit is not None:
+            return self.page(offset=offset, limit=limit, cat=cat).to_console(
+                keep_order=True
+            )
+
+        tasks = self.todos if keep_order else sorted(self.todos, key=_order_key)
+        if cat:
+            tasks = [task for task in tasks if (task.cat or "_") == cat]
+            if not tasks:
+                print(f"Category {cat} not found in tasks")
+        rows = [(task.cat or "_", task.to_hash(), task) for task in tasks]
+
+        if not rows:
+            raise ValueError("No tasks found")
+        longest_cat = max([len(row_cat) for (row_cat, _, _) in rows])
+        longest_name = max([len(task.name) for task in self.todos])
+
+        for (cat, task_hash, task) in rows:
+            task_hash_str = f"{task_hash}"
+            date = (
+                f'-> [{task.deadline.strftime("%d-%d-%Y")}]'
+                if task.deadline
+                else " " * 15
+            )
+            whitespace_cat = " " * (longest_cat - len(cat))
+            whitespace_name = " " * (longest_name - len(task.name))
+
+            print(
+                colored(task_hash_str, "yellow"),
+                colored(f"{date}", "red"),
+                colored(f"({cat})", "green"),
+                colored(f"{whitespace_cat}{task.name}{whitespace_name}", "cyan"),
+                f": {task.desc}",
+            )
+
+    def order(self) -> "Task_List":
+        """Order the task list by cat and due date
+
+        Args:
+            tasks : Task_List object
 
         Returns:
-            a dict with cat as first key and hash as task key
+            ordered Task_List object
         """
-        ordered_tasks = self.order()
-        no_cat = "_"
-        task_dict = {}
-        for task in ordered_tasks.to_list():
-            if task.cat:
-                if task.cat not in task_dict.keys():
-                    task_dict[task.cat] = {}
+        return Task_List(todos=sorted(self.todos, key=_order_key))
 
-                task_dict[task.cat][task.to_hash()] = task.dict()
+    def page(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cat: Optional[str] = None,
+    ) -> "Task_List":
+        """Get a slice of the ordered task list without sorting all tasks.
+            A heap is used to select the first offset + limit tasks.
 
-            else:
-                if no_cat not in task_dict.keys():
-                    task_dict[no_cat] = {}
+        Args:
+            offset : number of ordered tasks to skip. Defaults to 0.
+            limit : maximum number of tasks. Defaults to all.
+            cat : category to filter by, "_" for tasks without one
 
-                task_dict[no_cat][task.to_hash()] = task.dict()
+        Returns:
+            ordered Task_List object
+        """
+        tasks = self.todos
+        if cat:
+            tasks = [t for t in tasks if (t.cat or "_") == cat]
 
-        return task_dict
+        if limit is None:
+            return Task_List(todos=sorted(tasks, key=_order_key)[offset:])
 
-    def filter_by_category(
-        self,
-        hash_dict: Dict[str, Dict[str, Dict]],
-        category: str,
-    ) -> Dict[str, Dict[str, Dict]]:
-        try:
-            return {category: hash_dict[category]}
-        except KeyError:
-            print(f"Category {category} not found in tasks")
-            return {}
+        selected = heapq.nsmallest(offset + limit, tasks, key=_order_key)
+        return Task_List(todos=selected[offset:])
 
-    def to_console(self, cat: Optional[str] = "") -> None:
-        """Generate a colorcoded terminal output of the tasks
+
+class Task_Graph:
+    def __init__(self, tasks: Task_List) -> None:
+        """Dependency graph of the tasks. For every task the number of
+            blocking tasks in the list is kept, so finishing a task only
+            updates the tasks it blocks. The tasks without blocking tasks
+            are kept in a set of ready tasks.
 
         Args:
-            cat : category to filter by
+            tasks : a Task_List object
         """
-        task_hash_dict = self._hash_dict()
-        if cat:
-            task_hash_dict = self.filter_by_category(
-                hash_dict=task_hash_dict,
-                category=cat,
-            )
-        else:
-            pass
-        if task_hash_dict == {}:
-            raise ValueError("No tasks found")
-        longest_cat = max(list(map(len, task_hash_dict.keys())))
-        longest_name = max([len(task.name) for task in self.todos])
+        self._tasks: Dict[str, Task] = {}
+        self._in_degree: Dict[str, int] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        self._ready: Set[str] = set()
+        for task in tasks.to_list():
+            self._insert(task)
+
+    def _insert(self, task: Task) -> None:
+        task_hash = task.to_hash()
+        if task_hash in self._tasks:
+            self._detach(self._tasks[task_hash])
+
+        blockers = set(task.blocked_by)
+        self._tasks[task_hash] = task
+        self._in_degree[task_hash] = sum(blocker in self._tasks for blocker in blockers)
+        if self._in_degree[task_hash] == 0:
+            self._ready.add(task_hash)
+        for blocker in blockers:
+            self._dependents.setdefault(blocker, set()).add(task_hash)
+        for dependent in self._dependents.get(task_hash, ()):
+            if dependent in self._tasks:
+                self._in_degree[dependent] += 1
+                self._ready.discard(dependent)
+
+    def _blocks(self, task_hash: str, targets: Set[str]) -> bool:
+        """Check if a task blocks one of the targets, directly or through
+            other tasks
 
-        for key in task_hash_dict.keys():
+        Args:
+            task_hash : hash of the task to start from
+            targets : hashes to search for
 
-            cat = key
+        Returns:
+            True if a target is reachable
+        """
+        seen = {task_hash}
+        stack = [task_hash]
+        while stack:
+            for dependent in self._dependents.get(stack.pop(), ()):
+                if dependent in targets:
+                    return True
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
 
-            for task_hash in task_hash_dict[key]:
-                task = Task(**task_hash_dict[cat][task_hash])
+        return False
 
-                task_hash_str = f"{task_hash}"
-                date = (
-                    f'-> [{task.deadline.strftime("%d-%d-%Y")}]'
-                    if task.deadline
-                    else " " * 15
-                )
-                whitespace_cat = " " * (longest_cat - len(cat))
-                whitespace_name = " " * (longest_name - len(task.name))
-
-                print(
-                    colored(task_hash_str, "yellow"),
-                    colored(f"{date}", "red"),
-                    colored(f"({cat})", "green"),
-                    colored(f"{whitespace_cat}{task.name}{whitespace_name}", "cyan"),
-                    f": {task.desc}",
-                )
+    def add(self, task: Task) -> None:
+        """Add a task to the graph
 
-    def order(self) -> "Task_List":
-        """Order the task list by cat and due date
+        Args:
+            task : Task object
+
+        Raises:
+            ValueError: if the dependencies of the task would create a cycle
+        """
+        task_hash = task.to_hash()
+        blockers = set(task.blocked_by)
+        if task_hash in blockers or self._blocks(task_hash, blockers):
+            raise ValueError(f"Dependencies of task {task.name} would create a cycle")
+        self._insert(task)
+
+    def _detach(self, task: Task) -> None:
+        """Take a stored task out of the graph. The edges to its dependents
+            are kept, so the task can be inserted again.
 
         Args:
-            tasks : Task_List object
+            task : stored Task object
+        """
+        task_hash = task.to_hash()
+        self._tasks.pop(task_hash)
+        self._in_degree.pop(task_hash)
+        self._ready.discard(task_hash)
+        for blocker in set(task.blocked_by):
+            self._dependents.get(blocker, set()).discard(task_hash)
+        for dependent in self._dependents.get(task_hash, ()):
+            if dependent in self._tasks:
+                self._in_degree[dependent] -= 1
+                if self._in_degree[dependent] == 0:
+                    self._ready.add(dependent)
+
+    def remove(self, task: Task) -> List[Task]:
+        """Remove a finished task, unblock its dependents and drop it from
+            their blocked_by lists
+
+        Args:
+            task : Task object
 
         Returns:
-            ordered Task_List object
+            the updated dependents
         """
-        task_list = self.todos
+        task_hash = task.to_hash()
+        if task_hash not in self._tasks:
+            return []
+        self._detach(self._tasks[task_hash])
+        updated = []
+        for dependent in self._dependents.pop(task_hash, ()):
+            if dependent in self._tasks:
+                dependent_task = self._tasks[dependent]
+                dependent_task.blocked_by = [
+                    blocker
+                    for blocker in dependent_task.blocked_by
+                    if blocker != task_hash
+                ]
+                updated.append(dependent_task)
+
+        return updated
+
+    def actionable(self, limit: Optional[int] = None) -> Task_List:
+        """Tasks that are not blocked by another task, ordered by due date
 
-        # get cats and order them
-        cat_tasks = [t for t in task_list if t.cat]
-        cat_tasks.sort(key=lambda x: (x.cat, x.deadline is None))
+        Args:
+            limit : maximum number of tasks. Defaults to all.
 
-        non_cat_tasks = [t for t in task_list if not t.cat]
-        non_cat_tasks.sort(key=lambda x: (x.deadline is None, x.deadline))
+        Returns:
+            Task_List object
+        """
+        unblocked = [self._tasks[task_hash] for task_hash in self._ready]
+        if limit is None:
+            return Task_List(todos=sorted(unblocked, key=_deadline_key))
+
+        return Task_List(todos=heapq.nsmallest(limit, unblocked, key=_deadline_key))
+
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+class _Gzip_Writer(gzip.GzipFile):
+    def __init__(self, path: Path) -> None:
+        """Write a gzip file without file name and modification time in the
+            header, so the same tasks always give the same bytes. Level 6
+            compresses task files as well as the default 9 at a fraction of
+            the cpu.
+
+        Args:
+            path : path of the gzip file
+        """
+        self._raw_file = open(path, "wb")
+        super().__init__(
+            filename="", mode="wb", compresslevel=6, fileobj=self._raw_file, mtime=0
+        )
+
+    def close(self) -> None:
+        # GzipFile does not close a file object it was given
+        try:
+            super().close()
+        finally:
+            self._raw_file.close()
 
-        return Task_List(todos=cat_tasks + non_cat_tasks)
 
+def _gzip_open(path: Path, mode: str) -> IO:
+    """Open a gzip file in text mode, writing with a reproducible header"""
+    if mode.startswith("r"):
+        return gzip.open(path, mode)
 
-TASKS_PATH = Path(".gitodo")
+    return io.TextIOWrapper(_Gzip_Writer(path))
+
+
+COMPRESSED_SUFFIXES: Dict[str, Callable[..., IO]] = {
+    ".gz": _gzip_open,
+    ".xz": lzma.open,
+}
+COMPRESSED_MAGIC: Dict[bytes, Callable[..., IO]] = {
+    b"\x1f\x8b": _gzip_open,
+    b"\xfd7zXZ\x00": lzma.open,
+}
 
 
 class Tasks:
@@ -142,60 +350,106 @@ class Tasks:
         self,
         path: Union[Path, str] = TASKS_PATH,
         tasks: Task_List = Task_List(todos=[]),
+        backend: Optional["Storage_Backend"] = None,
     ) -> None:
         """A object to handle all tasks
 
         Args:
             path : path to save and load from
             tasks : Task_List object
+            backend : storage backend. Defaults to a backend matching the path
         """
         self.path = Path(path)
-        self._task_list = tasks
-        self._hashed_tasks_dict = self._task_list.to_hashed_tasks()
+        if backend is None:
+            backend = new_backend(path=self.path, tasks=tasks)
+        self._backend = backend
+        self._graph: Optional[Task_Graph] = None
 
     @classmethod
-    def from_file(cls, path: Path = TASKS_PATH) -> "Tasks":
-        """Load tasks from a json file
+    def from_file(cls, path: Optional[Union[Path, str]] = None) -> "Tasks":
+        """Load tasks from a json or sqlite file
+
+        Args:
+            path : path of the task file. Defaults to find_task_file().
 
         Returns:
             Tasks object
         """
+        path = find_task_file(path)
         try:
-            with open(path, "r") as tasks_json_file:
-                tasks_dict = json.load(tasks_json_file)
+            backend = open_backend(path)
 
         except FileNotFoundError:
             print("Task file was not found")
-            raise 
+            raise
 
-        task_list = list()
-        for (_, cat_tasks) in tasks_dict.items():
-            for task in cat_tasks.values():
-                task_list.append(Task(**task))
+        return cls(path=path, backend=backend)
 
-        return cls(path=path, tasks=Task_List(todos=task_list))
+    @property
+    def _task_list(self) -> Task_List:
+        return self._backend.to_task_list()
 
     def to_list(self) -> List[Task]:
         return self._task_list.to_list()
 
     def __len__(self) -> int:
-        return len(self._task_list)
+        return len(self._backend)
 
-    def print(self, cat: Optional[str] = None) -> None:
-        """Generate terminal output"""
+    def categories(self) -> List[str]:
+        return self._backend.categories()
+
+    def print(
+        self,
+        cat: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> None:
+        """Generate terminal output
+
+        Args:
+            cat : category to filter by
+            offset : number of ordered tasks to skip
+            limit : maximum number of tasks to print
+        """
+        if cat and cat not in self.categories():
+            print(f"Category {cat} not found in tasks")
         try:
-            self._task_list.to_console(cat)
+            self._backend.page(offset=offset, limit=limit, cat=cat).to_console(
+                keep_order=True
+            )
         except ValueError as ve:
             print(str(ve))
 
+    def _dependency_graph(self) -> Task_Graph:
+        """Build the dependency graph on first use"""
+        if self._graph is None:
+            self._graph = Task_Graph(self._task_list)
+        return self._graph
+
     def add_task(self, task: Task) -> None:
         """Add a task to the list
 
         Args:
             task : Task Object
+
+        Raises:
+            ValueError: if the dependencies of the task would create a cycle
+        """
+        # a task without dependencies can not close a cycle
+        if task.blocked_by or self._graph is not None:
+            self._dependency_graph().add(task)
+        self._backend.add(task)
+
+    def next_tasks(self, limit: Optional[int] = None) -> Task_List:
+        """Tasks that are not blocked by an other task, ordered by due date
+
+        Args:
+            limit : maximum number of tasks. Defaults to all.
+
+        Returns:
+            Task_List object
         """
-        self._task_list.todos.append(task)
-        self._hashed_tasks_dict = self._task_list.to_hashed_tasks()
+        return self._dependency_graph().actionable(limit=limit)
 
     def find_task(
         self, task_hash: Optional[str] = None, task_name: Optional[str] = None
@@ -210,23 +464,11 @@ class Tasks:
         Returns:
             listed Task objects
         """
-        try:
-            if task_hash and task_name:
-                return find_task_for_name(
-                    tasks=find_task_for_hash(
-                        self._hashed_tasks_dict, short_hash=task_hash
-                    ),
-                    name=task_name,
-                )
-
-            elif task_hash:
-                return find_task_for_hash(self._hashed_tasks_dict, short_hash=task_hash)
-
-            elif task_name:
-                return find_task_for_name(self._task_list, name=task_name)
+        if not task_hash and not task_name:
+            return Task_List(todos=[])
 
-            else:
-                return Task_List(todos=[])
+        try:
+            return self._backend.find(task_hash=task_hash, task_name=task_name)
 
         except KeyError as ke:
             print(str(ke))
@@ -246,32 +488,97 @@ class Tasks:
         if num_matched != 1:
             print("No specific task could be found")
         else:
+            task = matched_tasks.to_list()[0]
             try:
-                self._hashed_tasks_dict._delete(task=matched_tasks.to_list()[0])
-                print(f"Task {matched_tasks.to_list()[0]} removed from list")
+                self._backend.delete(task=task)
             except KeyError:
                 print("Task could not be found")
-            self._task_list = self._hashed_tasks_dict.to_task_list()
+                return
+
+            if self._graph is not None:
+                # the graph knows the dependents, no need to search the backend
+                dependents = self._graph.remove(task)
+            else:
+                finished_hash = task.to_hash()
+                dependents = self._backend.dependents(finished_hash).to_list()
+                for dependent in dependents:
+                    dependent.blocked_by = [
+                        blocker
+                        for blocker in dependent.blocked_by
+                        if blocker != finished_hash
+                    ]
+            for dependent in dependents:
+                self._backend.update(dependent)
+            print(f"Task {task} removed from list")
 
     def save(self, path: Optional[Path] = None) -> None:
-        """Export the tasks to a json file
+        """Export the tasks to the storage backend and update the completion
+            index next to the task file
 
         Args:
             path : destination path. Defaults to path set in init.
         """
-        if not path:
-            path = self.path
+        self._backend.save(path)
 
-        Path("".join(path.parts[:-1])).mkdir(parents=True, exist_ok=True)
+        hashes, names, cats = self._backend.completion_candidates()
+        write_completion_index(
+            path=Path(path or self.path), hashes=hashes, names=names, cats=cats
+        )
 
-        with open(path, "w") as json_file:
-            json.dump(
-                obj=self._hashed_tasks_dict.hashed,
-                default=self._hashed_tasks_dict._hashed_task_serializer,
-                fp=json_file,
-                ensure_ascii=True,
-                indent=2,
-            )
+    @staticmethod
+    def page_from_file(
+        path: Optional[Union[Path, str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cat: Optional[str] = None,
+    ) -> Task_List:
+        """Read a page of ordered tasks without loading the whole list. Json
+            files are read in their saved order, sqlite uses its indexes.
+
+        Args:
+            path : path of the task file. Defaults to find_task_file().
+            offset : number of ordered tasks to skip
+            limit : maximum number of tasks. Defaults to all.
+            cat : category to filter by, "_" for tasks without one
+
+        Raises:
+            FileNotFoundError: if the file does not exist
+
+        Returns:
+            ordered Task_List object
+        """
+        path = find_task_file(path)
+        if not path.is_file():
+            print("Task file was not found")
+            raise FileNotFoundError(f"No such file: '{path}'")
+        if is_sqlite_file(path):
+            return Sqlite_Backend(path).page(offset=offset, limit=limit, cat=cat)
+
+        return Json_Backend.page_from_file(path, offset=offset, limit=limit, cat=cat)
+
+    def migrate(self, path: Union[Path, str]) -> "Tasks":
+        """Copy all tasks to a new file. The storage backend is chosen by
+            the suffix of the destination.
+
+        Args:
+            path : destination path
+
+        Raises:
+            FileExistsError: if the destination already exists
+
+        Returns:
+            Tasks object for the destination
+        """
+        if Path(path).exists():
+            raise FileExistsError(f"Destination {path} already exists")
+
+        # the source has no cycles, so the tasks are stored without the
+        # dependency checks of add_task
+        migrated = Tasks(path=path, tasks=Task_List(todos=[]))
+        migrated._backend.add_many(self.to_list())
+        migrated.save()
+
+        return migrated
 
     def __enter__(self) -> "Tasks":
         return self
@@ -282,12 +589,37 @@ class Tasks:
 
 class Hashed_Tasks:
     def __init__(self, tasks: Task_List) -> None:
-        """Hash representation of the tasks
+        """Hash representation of the tasks. Every task is stored once by its
+            hash. The categories are an index of hashes on top of it, kept in
+            the order of Task_List.order while tasks are added. Category
+            strings are interned and equal due dates share one date object.
 
         Args:
             tasks : a Task_List object
         """
-        self._hashed_tasks: Dict[str, Dict[str, Dict]] = tasks._hash_dict()
+        self._tasks: Dict[str, Task] = {}
+        # cat -> rest of the order key -> hashes in insertion order
+        self._categories: Dict[str, Dict[Tuple, Dict[str, None]]] = {}
+        self._dates: Dict[date, date] = {}
+        for task in tasks.to_list():
+            self._add(task)
+
+    def _add(self, task: Task) -> None:
+        """Add a task and index it by category. A stored task with the same
+            hash is replaced.
+
+        Args:
+            task : Task object
+        """
+        if task.cat:
+            task.cat = sys.intern(task.cat)
+        if task.deadline:
+            task.deadline = self._dates.setdefault(task.deadline, task.deadline)
+
+        task_hash = task.to_hash()
+        self._tasks[task_hash] = task
+        cat_index = self._categories.setdefault(task.cat or "_", {})
+        cat_index.setdefault(_order_key(task)[2:], {})[task_hash] = None
 
     def _delete(self, task: Task) -> Optional[Task]:
         """Pop tasks from the dict
@@ -295,26 +627,76 @@ class Hashed_Tasks:
         Args:
             task : task that should be removed
 
+        Raises:
+            KeyError: if the task is not stored
+
         Returns:
             poped task
         """
-        matches = list()
-        for (cat_key, cat_task) in self._hashed_tasks.items():
-            for (task_hash, task_value) in cat_task.items():
-                if task == task_value:
-                    matches.append((cat_key, task_hash))
+        task_hash = task.to_hash()
+        poped = self._tasks.pop(task_hash)
+
+        cat = poped.cat or "_"
+        bucket = _order_key(poped)[2:]
+        self._categories[cat][bucket].pop(task_hash)
+        if not self._categories[cat][bucket]:
+            self._categories[cat].pop(bucket)
+        if not self._categories[cat]:
+            self._categories.pop(cat)
+
+        return poped
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def by_hash(self) -> Dict[str, Task]:
+        """Returns the tasks by hash
+
+        Returns:
+            Tasks by hash
+        """
+        return self._tasks
+
+    @property
+    def categories(self) -> List[str]:
+        """Returns the ordered categories, "_" for tasks without one
+
+        Returns:
+            categories
+        """
+        return sorted(self._categories, key=lambda cat: (cat == "_", cat))
+
+    def ordered(self, cat: Optional[str] = None) -> Iterator[Tuple[str, Task]]:
+        """Iterate over the tasks in the order of Task_List.order. Only the
+            categories and due dates are sorted, not the tasks.
+
+        Args:
+            cat : category to filter by, "_" for tasks without one
 
-        for (cat, task_hash) in matches:
-            self._hashed_tasks[cat].pop(task_hash)
+        Returns:
+            hash and task
+        """
+        categories = [cat] if cat else self.categories
+        for cat_key in categories:
+            cat_index = self._categories.get(cat_key, {})
+            for bucket in sorted(cat_index):
+                for task_hash in cat_index[bucket]:
+                    yield task_hash, self._tasks[task_hash]
 
     @property
-    def hashed(self):
-        """Returns the hash dict
+    def hashed(self) -> Dict[str, Dict[str, Task]]:
+        """Returns the ordered hash dict with category as first key. The
+            tasks are not copied.
 
         Returns:
             Hashed tasks
         """
-        return self._hashed_tasks
+        hashed_tasks: Dict[str, Dict[str, Task]] = {}
+        for (task_hash, task) in self.ordered():
+            hashed_tasks.setdefault(task.cat or "_", {})[task_hash] = task
+
+        return hashed_tasks
 
     def to_task_list(self) -> Task_List:
         """Convert the hash list to a Task_List
@@ -322,22 +704,21 @@ class Hashed_Tasks:
         Returns:
             Task_List object
         """
-        task_list = list()
-        for cat_tasks in self._hashed_tasks.values():
-            for task in cat_tasks.values():
-                task_list.append(Task(**task))
-
-        return Task_List(todos=task_list)
+        return Task_List.construct(todos=list(self._tasks.values()))
 
     def _hashed_task_serializer(self, o):
-        """Internal function to seriialize the object, specific the datetime object
+        """Internal function to seriialize the object, specific the task and
+            datetime objects. A task becomes a shallow dict only while it is
+            written.
 
         Args:
             o : object
 
         Returns:
-            datetime in isoformat
+            task as dict or datetime in isoformat
         """
+        if isinstance(o, Task):
+            return dict(o)
         if isinstance(o, (date, datetime)):
             return o.isoformat()
 
@@ -356,12 +737,9 @@ def find_task_for_hash(hashed_tasks: Hashed_Tasks, short_hash: str) -> Task_List
 
     """
     task_matches = list()
-    # hashed_tasks = hash_dict(tasks)
-    for hashed_task_cat in hashed_tasks.hashed.keys():
-        cat_x_tasks = hashed_tasks.hashed[hashed_task_cat]
-        for hashed_task_key in cat_x_tasks.keys():
-            if hashed_task_key.startswith(short_hash):
-                task_matches.append(Task(**cat_x_tasks[hashed_task_key]))
+    for (task_hash, task) in hashed_tasks.by_hash.items():
+        if task_hash.startswith(short_hash):
+            task_matches.append(task)
 
     return Task_List(todos=task_matches)
 
@@ -374,3 +752,575 @@ def find_task_for_name(tasks: Task_List, name: str) -> Task_List:
             task_matches.append(task)
 
     return Task_List(todos=task_matches)
+
+
+class Storage_Backend(ABC):
+    """Interface for the storage of tasks used by the Tasks object"""
+
+    path: Path
+
+    @abstractmethod
+    def to_task_list(self) -> Task_List:
+        """Get all stored tasks"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored tasks"""
+
+    @abstractmethod
+    def add(self, task: Task) -> None:
+        """Store a task"""
+
+    @abstractmethod
+    def add_many(self, tasks: List[Task]) -> None:
+        """Store several tasks at once"""
+
+    @abstractmethod
+    def delete(self, task: Task) -> None:
+        """Remove a task. Raises KeyError if the task is not stored"""
+
+    @abstractmethod
+    def update(self, task: Task) -> None:
+        """Replace the stored task with the same hash"""
+
+    @abstractmethod
+    def dependents(self, task_hash: str) -> Task_List:
+        """Tasks that are blocked by the task with the given hash"""
+
+    @abstractmethod
+    def find(
+        self, task_hash: Optional[str] = None, task_name: Optional[str] = None
+    ) -> Task_List:
+        """Find tasks by name and/or part of the hash"""
+
+    @abstractmethod
+    def categories(self) -> List[str]:
+        """Categories of the stored tasks, "_" for tasks without one"""
+
+    @abstractmethod
+    def completion_candidates(self) -> Tuple[List[str], List[str], List[str]]:
+        """Hashes, names and categories of the stored tasks for the shell
+        completion"""
+
+    @abstractmethod
+    def page(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cat: Optional[str] = None,
+    ) -> Task_List:
+        """Get a slice of the ordered tasks"""
+
+    @abstractmethod
+    def save(self, path: Optional[Path] = None) -> None:
+        """Persist the tasks"""
+
+
+class Json_Backend(Storage_Backend):
+    def __init__(self, path: Path, tasks: Task_List) -> None:
+        """Keep the tasks in memory and store them as a json file
+
+        Args:
+            path : path of the json file
+            tasks : Task_List object
+        """
+        self.path = path
+        self._hashed_tasks_dict = tasks.to_hashed_tasks()
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Json_Backend":
+        """Load tasks from a json file. Compressed files are decompressed
+            while reading.
+
+        Returns:
+            Json_Backend object
+        """
+        with open_task_file(path, "r") as tasks_json_file:
+            tasks_dict = json.load(tasks_json_file)
+
+        task_list = list()
+        for (_, cat_tasks) in tasks_dict.items():
+            for task in cat_tasks.values():
+                task_list.append(Task(**task))
+
+        return cls(path=path, tasks=Task_List.construct(todos=task_list))
+
+    @staticmethod
+    def page_from_file(
+        path: Path,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cat: Optional[str] = None,
+    ) -> Task_List:
+        """Read a page of tasks from a json file without loading the whole
+            list. Saved files are already ordered, so the tasks are taken in
+            file order. Only the tasks of the page are validated and
+            categories that are filtered out are skipped as a whole.
+
+        Args:
+            path : path of the json file
+            offset : number of ordered tasks to skip. Defaults to 0.
+            limit : maximum number of tasks. Defaults to all.
+            cat : category to filter by, "_" for tasks without one
+
+        Returns:
+            ordered Task_List object
+        """
+        with open_task_file(path, "r") as tasks_json_file:
+            text = tasks_json_file.read()
+
+        stop = None if limit is None else offset + limit
+        raw_tasks = islice(_iter_raw_tasks(text, cat=cat), offset, stop)
+        return Task_List.construct(todos=[Task(**raw) for raw in raw_tasks])
+
+    def to_task_list(self) -> Task_List:
+        return self._hashed_tasks_dict.to_task_list()
+
+    def __len__(self) -> int:
+        return len(self._hashed_tasks_dict)
+
+    def add(self, task: Task) -> None:
+        self._hashed_tasks_dict._add(task)
+
+    def add_many(self, tasks: List[Task]) -> None:
+        for task in tasks:
+            self._hashed_tasks_dict._add(task)
+
+    def delete(self, task: Task) -> None:
+        self._hashed_tasks_dict._delete(task=task)
+
+    def update(self, task: Task) -> None:
+        self._hashed_tasks_dict._add(task)
+
+    def dependents(self, task_hash: str) -> Task_List:
+        return Task_List.construct(
+            todos=[
+                task
+                for task in self._hashed_tasks_dict.by_hash.values()
+                if task_hash in task.blocked_by
+            ]
+        )
+
+    def find(
+        self, task_hash: Optional[str] = None, task_name: Optional[str] = None
+    ) -> Task_List:
+        if task_hash and task_name:
+            return find_task_for_name(
+                tasks=find_task_for_hash(self._hashed_tasks_dict, short_hash=task_hash),
+                name=task_name,
+            )
+
+        elif task_hash:
+            return find_task_for_hash(self._hashed_tasks_dict, short_hash=task_hash)
+
+        else:
+            return find_task_for_name(self.to_task_list(), name=task_name or "")
+
+    def categories(self) -> List[str]:
+        return self._hashed_tasks_dict.categories
+
+    def completion_candidates(self) -> Tuple[List[str], List[str], List[str]]:
+        by_hash = self._hashed_tasks_dict.by_hash
+        return (
+            list(by_hash),
+            [task.name for task in by_hash.values()],
+            [cat for cat in self._hashed_tasks_dict.categories if cat != "_"],
+        )
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cat: Optional[str] = None,
+    ) -> Task_List:
+        stop = None if limit is None else offset + limit
+        ordered = self._hashed_tasks_dict.ordered(cat=cat)
+        return Task_List.construct(
+            todos=[task for (_, task) in islice(ordered, offset, stop)]
+        )
+
+    def save(self, path: Optional[Path] = None) -> None:
+        """Export the tasks to a json file. The file is compressed while
+            writing if it has a .gz or .xz suffix or already is compressed.
+
+        Args:
+            path : destination path. Defaults to path set in init.
+        """
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open_task_file(path, "w") as json_file:
+            json.dump(
+                obj=self._hashed_tasks_dict.hashed,
+                default=self._hashed_tasks_dict._hashed_task_serializer,
+                fp=json_file,
+                ensure_ascii=True,
+                indent=2,
+            )
+
+
+class Sqlite_Backend(Storage_Backend):
+    _COLUMNS = ("name", "desc", "cat", "deadline", "blocked_by")
+
+    def __init__(self, path: Path) -> None:
+        """Store the tasks in a sqlite database. Every change is written
+            directly, queries use the indexes on hash and name and the
+            indexes on category and deadline in the order of Task_List.order.
+
+        Args:
+            path : path of the database file
+        """
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path))
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    hash TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    desc TEXT NOT NULL,
+                    cat TEXT,
+                    deadline TEXT,
+                    blocked_by TEXT NOT NULL DEFAULT '[]'
+                );
+                DROP INDEX IF EXISTS tasks_cat;
+                DROP INDEX IF EXISTS tasks_deadline;
+                CREATE INDEX IF NOT EXISTS tasks_name ON tasks (name);
+                CREATE INDEX IF NOT EXISTS tasks_order ON tasks (
+                    cat IS NULL,
+                    cat,
+                    deadline IS NULL,
+                    (CASE WHEN cat IS NULL THEN deadline END)
+                );
+                CREATE INDEX IF NOT EXISTS tasks_cat_order ON tasks (
+                    cat,
+                    deadline IS NULL,
+                    (CASE WHEN cat IS NULL THEN deadline END)
+                );
+                """
+            )
+            columns = [
+                row["name"]
+                for row in self._connection.execute("PRAGMA table_info(tasks)")
+            ]
+            # databases created before dependencies were added
+            if "blocked_by" not in columns:
+                self._connection.execute(
+                    "ALTER TABLE tasks ADD COLUMN blocked_by TEXT NOT NULL DEFAULT '[]'"
+                )
+
+    def _select(
+        self, where: str = "", params: Tuple = (), suffix: str = ""
+    ) -> Task_List:
+        """Run a select on the task table
+
+        Args:
+            where : sql condition
+            params : parameters of the query
+            suffix : ordering and limits appended to the query
+
+        Returns:
+            Task_List object
+        """
+        query = f"SELECT {', '.join(self._COLUMNS)} FROM tasks"
+        if where:
+            query += f" WHERE {where}"
+        rows = self._connection.execute(f"{query} {suffix}", params)
+
+        return Task_List(
+            todos=[
+                Task(**{**dict(row), "blocked_by": json.loads(row["blocked_by"])})
+                for row in rows
+            ]
+        )
+
+    def to_task_list(self) -> Task_List:
+        return self._select(suffix="ORDER BY rowid")
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    @staticmethod
+    def _row(task: Task) -> Tuple:
+        return (
+            task.to_hash(),
+            task.name,
+            task.desc,
+            task.cat,
+            task.deadline.isoformat() if task.deadline else None,
+            json.dumps(task.blocked_by),
+        )
+
+    def add(self, task: Task) -> None:
+        self.add_many([task])
+
+    def add_many(self, tasks: List[Task]) -> None:
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+                map(self._row, tasks),
+            )
+
+    def delete(self, task: Task) -> None:
+        with self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM tasks WHERE hash = ?", (task.to_hash(),)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(task.to_hash())
+
+    def update(self, task: Task) -> None:
+        # every other column is part of the hash
+        with self._connection:
+            self._connection.execute(
+                "UPDATE tasks SET blocked_by = ? WHERE hash = ?",
+                (json.dumps(task.blocked_by), task.to_hash()),
+            )
+
+    def dependents(self, task_hash: str) -> Task_List:
+        # blocked_by is stored as a json list of quoted hashes
+        return self._select("blocked_by LIKE ?", (f'%"{task_hash}"%',))
+
+    def find(
+        self, task_hash: Optional[str] = None, task_name: Optional[str] = None
+    ) -> Task_List:
+        conditions = list()
+        params: Tuple = ()
+        if task_hash:
+            # hashes are lowercase hex, "~" sorts after every hash character
+            conditions.append("hash >= ? AND hash < ?")
+            params += (task_hash, f"{task_hash}~")
+        if task_name:
+            conditions.append("name = ?")
+            params += (task_name,)
+
+        return self._select(" AND ".join(conditions), params, "ORDER BY rowid")
+
+    def categories(self) -> List[str]:
+        # NULL sorts first, tasks without a category are listed last
+        cats = [
+            row[0]
+            for row in self._connection.execute(
+                "SELECT DISTINCT cat FROM tasks ORDER BY cat"
+            )
+        ]
+        if cats and cats[0] is None:
+            cats = cats[1:] + ["_"]
+        return cats
+
+    def completion_candidates(self) -> Tuple[List[str], List[str], List[str]]:
+        rows = self._connection.execute("SELECT hash, name, cat FROM tasks").fetchall()
+        return (
+            [row["hash"] for row in rows],
+            [row["name"] for row in rows],
+            [row["cat"] for row in rows if row["cat"]],
+        )
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cat: Optional[str] = None,
+    ) -> Task_List:
+        # same ordering as Task_List.order. The order by terms match the
+        # tasks_order and tasks_cat_order indexes, so a page reads only its
+        # rows instead of sorting the table.
+        where = ""
+        params: Tuple = ()
+        order = "deadline IS NULL, CASE WHEN cat IS NULL THEN deadline END, rowid"
+        if cat == "_":
+            where = "cat IS NULL"
+        elif cat:
+            where, params = "cat = ?", (cat,)
+        else:
+            order = f"cat IS NULL, cat, {order}"
+
+        suffix = f"ORDER BY {order} LIMIT ? OFFSET ?"
+        params += (-1 if limit is None else limit, offset)
+
+        return self._select(where, params, suffix)
+
+    def save(self, path: Optional[Path] = None) -> None:
+        """Commit the database. If a path is given the database is copied
+
+        Args:
+            path : destination path. Defaults to path set in init.
+        """
+        self._connection.commit()
+        if path and Path(path) != self.path:
+            destination = sqlite3.connect(str(path))
+            with destination:
+                self._connection.backup(destination)
+            destination.close()
+
+
+def is_sqlite_file(path: Path) -> bool:
+    """Check if a path points to a sqlite database, either by suffix or by
+        the header of an existing file
+
+    Args:
+        path : path to check
+
+    Returns:
+        True for sqlite databases
+    """
+    if path.suffix in SQLITE_SUFFIXES:
+        return True
+    try:
+        with open(path, "rb") as tasks_file:
+            return tasks_file.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except (FileNotFoundError, IsADirectoryError):
+        return False
+
+
+def measure_memory(path: Optional[Union[Path, str]] = None) -> Tuple[Tasks, int]:
+    """Load a task file and measure the memory the loaded tasks occupy. All
+        tasks are materialised while tracing, a sqlite backend otherwise
+        only holds a connection.
+
+    Args:
+        path : path of the task file. Defaults to find_task_file().
+
+    Returns:
+        loaded Tasks object and the bytes still allocated for the tasks
+    """
+    tracemalloc.start()
+    try:
+        tasks = Tasks.from_file(path)
+        task_list = tasks.to_list()
+        size, _ = tracemalloc.get_traced_memory()
+        del task_list
+    finally:
+        tracemalloc.stop()
+
+    return tasks, size
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _skip_whitespace(text: str, idx: int) -> int:
+    return _WHITESPACE.match(text, idx).end()  # type: ignore
+
+
+def _expect(text: str, idx: int, char: str) -> int:
+    """Skip whitespace and one expected character of a json text
+
+    Args:
+        text : json text
+        idx : current position
+        char : expected character
+
+    Raises:
+        ValueError: if another character is found
+
+    Returns:
+        position after the character and the following whitespace
+    """
+    idx = _skip_whitespace(text, idx)
+    if text[idx : idx + 1] != char:
+        raise ValueError(f"Expected '{char}' at position {idx} of the task file")
+    return _skip_whitespace(text, idx + 1)
+
+
+def _iter_raw_tasks(text: str, cat: Optional[str] = None) -> Iterator[Dict]:
+    """Iterate over the task dicts of a json task file in file order. Each
+        task is decoded only when it is reached.
+
+    Args:
+        text : content of the task file
+        cat : only yield tasks of this category
+
+    Returns:
+        raw task dicts
+    """
+    decoder = json.JSONDecoder()
+    idx = _expect(text, 0, "{")
+    while text[idx : idx + 1] != "}":
+        cat_key, idx = decoder.raw_decode(text, idx)
+        idx = _expect(text, idx, ":")
+
+        if cat and cat_key != cat:
+            _, idx = decoder.raw_decode(text, idx)
+        else:
+            idx = _expect(text, idx, "{")
+            while text[idx : idx + 1] != "}":
+                _, idx = decoder.raw_decode(text, idx)
+                task, idx = decoder.raw_decode(text, _expect(text, idx, ":"))
+                yield task
+                idx = _skip_whitespace(text, idx)
+                if text[idx : idx + 1] == ",":
+                    idx = _skip_whitespace(text, idx + 1)
+            idx += 1
+
+        idx = _skip_whitespace(text, idx)
+        if text[idx : idx + 1] == ",":
+            idx = _skip_whitespace(text, idx + 1)
+
+
+def open_task_file(path: Path, mode: str) -> IO:
+    """Open a json task file in text mode. Gzip and xz compression are
+        detected by the suffix or, for existing files, by the magic bytes.
+
+    Args:
+        path : path of the task file
+        mode : "r" or "w"
+
+    Returns:
+        file object
+    """
+    opener = COMPRESSED_SUFFIXES.get(path.suffix)
+    if opener is None:
+        try:
+            with open(path, "rb") as tasks_file:
+                header = tasks_file.read(max(map(len, COMPRESSED_MAGIC)))
+        except (FileNotFoundError, IsADirectoryError):
+            header = b""
+        for (magic, magic_opener) in COMPRESSED_MAGIC.items():
+            if header.startswith(magic):
+                opener = magic_opener
+
+    if opener is None:
+        return open(path, mode)
+
+    return opener(path, f"{mode}t")
+
+
+def new_backend(path: Path, tasks: Task_List) -> Storage_Backend:
+    """Create a storage backend for a new task file
+
+    Args:
+        path : path of the task file
+        tasks : initial tasks
+
+    Returns:
+        sqlite backend for sqlite suffixes, json backend otherwise
+    """
+    if path.suffix in SQLITE_SUFFIXES:
+        backend = Sqlite_Backend(path)
+        backend.add_many(tasks.to_list())
+        return backend
+
+    return Json_Backend(path=path, tasks=tasks)
+
+
+def open_backend(path: Path) -> Storage_Backend:
+    """Open the storage backend of an existing task file
+
+    Args:
+        path : path of the task file
+
+    Raises:
+        FileNotFoundError: if the file does not exist
+
+    Returns:
+        storage backend
+    """
+    if not path.is_file():
+        raise FileNotFoundError(f"No such file: '{path}'")
+    if is_sqlite_file(path):
+        return Sqlite_Backend(path)
+
+    return Json_Backend.from_file(path)
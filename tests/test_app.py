@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import click
+import pytest
+from typer.testing import CliRunner
+
+from gitodo.app import app
+from gitodo.completion import TASKS_FILE_ENV, complete_name
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(TASKS_FILE_ENV, raising=False)
+    return tmp_path
+
+
+class Test_Task_File:
+    @pytest.mark.parametrize("name", [".gitodo.gz", ".gitodo.xz", ".gitodo.db"])
+    def test_init_and_add(self, workdir, name):
+
+        assert runner.invoke(app, ["init", name]).exit_code == 0
+
+        added = runner.invoke(app, ["add", "x", "y"])
+        listed = runner.invoke(app, ["list"])
+        paged = runner.invoke(app, ["list", "--limit", "1"])
+
+        assert "Added task" in added.output
+        assert "x" in listed.output
+        assert "x" in paged.output
+        assert not (workdir / ".gitodo").exists()
+        assert complete_name(click.Context(click.Command("gitodo")), "") == ["x"]
+
+    def test_file_option(self, workdir):
+
+        runner.invoke(app, ["init"])
+        runner.invoke(app, ["--file", "other.db", "init"])
+        runner.invoke(app, ["-f", "other.db", "add", "x", "y"])
+
+        assert runner.invoke(app, ["stats"]).output.startswith("Tasks      : 0")
+        assert runner.invoke(app, ["-f", "other.db", "stats"]).output.startswith(
+            "Tasks      : 1"
+        )
+
+        root = click.Context(click.Command("gitodo"))
+        root.params["file"] = "other.db"
+        assert complete_name(click.Context(click.Command("add"), parent=root), "") == [
+            "x"
+        ]
+
+    def test_environment_variable(self, workdir, monkeypatch):
+
+        monkeypatch.setenv(TASKS_FILE_ENV, str(Path("tasks") / "todo.gz"))
+        runner.invoke(app, ["init"])
+        runner.invoke(app, ["add", "x", "y"])
+
+        assert (workdir / "tasks" / "todo.gz").is_file()
+        assert "x" in runner.invoke(app, ["list"]).output
@@ -1,13 +1,19 @@
 import datetime
+import gzip
+import json
 import os
 import random
 import re
 import string
 from pathlib import Path
 
+import click
 import pytest
 
-from gitodo.tasks import TASKS_PATH, Task, Task_List, Tasks
+from gitodo.completion import (TASKS_FILE_ENV, complete_cat, complete_hash,
+                               completion_index_path, find_task_file)
+from gitodo.tasks import (TASKS_PATH, Hashed_Tasks, Sqlite_Backend, Task,
+                          Task_Graph, Task_List, Tasks, measure_memory)
 
 
 @pytest.fixture
@@ -65,6 +71,7 @@ class Test_Task_Class:
             "desc": "desc",
             "cat": None,
             "deadline": None,
+            "blocked_by": [],
         }
 
     def test_task_with_deadline(self):
@@ -79,6 +86,7 @@ class Test_Task_Class:
             "desc": "desc",
             "deadline": datetime.date.fromisoformat("2021-01-01"),
             "cat": None,
+            "blocked_by": [],
         }
 
     def test_task_with_cat(self):
@@ -89,6 +97,7 @@ class Test_Task_Class:
             "desc": "desc",
             "deadline": None,
             "cat": "cat",
+            "blocked_by": [],
         }
 
     def test_task_with_cat_deadline(self):
@@ -103,6 +112,7 @@ class Test_Task_Class:
             "desc": "desc",
             "deadline": datetime.date.fromisoformat("2021-01-01"),
             "cat": "cat",
+            "blocked_by": [],
         }
 
     def test_task_hash(self, gen_random_task_cat_x):
@@ -165,7 +175,7 @@ class Test_Task_List:
 
     def test_hash_dict_conversion(self, random_task_list):
 
-        t = random_task_list._hash_dict()
+        t = random_task_list.to_hashed_tasks().hashed
 
         for (cat, cat_tasks) in t.items():
             assert cat in ["Cat x", "Cat y", "_"]
@@ -175,8 +185,8 @@ class Test_Task_List:
 
             for task_hash, task in cat_tasks.items():
                 assert re.match(r"([a-fA-F\d]{10})", task_hash)
-                assert task["cat"] == cat
-                assert task_hash == Task(**task).to_hash()
+                assert task.cat == cat
+                assert task_hash == task.to_hash()
 
     def test_order(self, random_task_list):
 
@@ -202,6 +212,26 @@ class Test_Task_List:
             for i in range(len(ordered_date_non_cat) - 1)
         )
 
+    def test_page_matches_order(self, random_task_list):
+
+        ordered = random_task_list.order().todos
+
+        assert random_task_list.page(limit=5).todos == ordered[:5]
+        assert random_task_list.page(offset=5, limit=5).todos == ordered[5:10]
+        assert random_task_list.page(offset=15).todos == ordered[15:]
+
+    def test_page_filter_category(self, random_task_list):
+
+        page = random_task_list.page(limit=3, cat="Cat x")
+
+        assert len(page) <= 3
+        assert all(task.cat == "Cat x" for task in page.todos)
+
+    def test_to_console_limit(self, random_task_list, capsys):
+        random_task_list.to_console(limit=3)
+        out, _ = capsys.readouterr()
+        assert len(out.strip().split("\n")) == 3
+
 
 @pytest.fixture
 def empty_tasks():
@@ -298,6 +328,7 @@ class Test_Tasks:
         t_reload = Tasks.from_file(test_save)
 
         os.remove(test_save)
+        os.remove(completion_index_path(test_save))
 
         t_hashes = [task.to_hash() for task in t.to_list()]
         t_reload_hashes = [task.to_hash() for task in t_reload.to_list()]
@@ -305,6 +336,27 @@ class Test_Tasks:
         assert len(t_hashes) == len(t_reload_hashes)
         assert len(set(t_hashes).intersection(set(t_reload_hashes))) == len(t_hashes)
 
+    @pytest.mark.parametrize("name", [".gitodo", ".gitodo.gz", "tasks.db"])
+    @pytest.mark.parametrize("cat", [None, "Cat x", "_"])
+    def test_page_from_file(self, tmp_path, random_task_list, name, cat):
+
+        p = tmp_path / name
+        Tasks(tasks=random_task_list, path=p).save()
+
+        expected = random_task_list.page(cat=cat).todos
+
+        assert Tasks.page_from_file(p, cat=cat).todos == expected
+        assert Tasks.page_from_file(p, offset=2, limit=3, cat=cat).todos == (
+            expected[2:5]
+        )
+
+    def test_save_creates_parent_dirs(self, tmp_path, random_task_list):
+
+        p = tmp_path / "a" / "b" / ".gitodo"
+        Tasks(tasks=random_task_list, path=p).save()
+
+        assert p.is_file()
+
     def test_context_manager(self, random_task_list):
 
         p = Path("./tests/.gitodo.delme")
@@ -318,3 +370,382 @@ class Test_Tasks:
 
         with Tasks.from_file(p) as tasks:
             assert len(tasks) > 0
+
+        os.remove(p)
+        os.remove(completion_index_path(p))
+
+    def test_empty_cat(self):
+
+        assert Task(name="name", desc="desc", cat="").cat is None
+
+    def test_hash_ignores_dependencies(self, identity_task):
+
+        blocked = Task(**identity_task.dict(exclude={"blocked_by"}), blocked_by=["a"])
+
+        assert blocked.to_hash() == identity_task.to_hash()
+
+
+class Test_Hashed_Tasks:
+    def test_tasks_stored_once(self, random_task_list):
+
+        hashed_tasks = Hashed_Tasks(random_task_list)
+
+        for (cat, cat_tasks) in hashed_tasks.hashed.items():
+            for (task_hash, task) in cat_tasks.items():
+                assert hashed_tasks.by_hash[task_hash] is task
+                assert (task.cat or "_") == cat
+
+    def test_shared_cat_and_date(self, gen_random_task_cat_x):
+
+        # json creates a new string object for every value
+        raw_tasks = json.loads(
+            json.dumps([gen_random_task_cat_x(), gen_random_task_cat_x()])
+        )
+        first, second = [Task(**raw_task) for raw_task in raw_tasks]
+        assert first.cat is not second.cat
+        assert first.deadline is not second.deadline
+
+        Hashed_Tasks(Task_List.construct(todos=[first, second]))
+
+        assert first.cat is second.cat
+        assert first.deadline is second.deadline
+
+    def test_ordered_matches_order(self, random_task_list):
+
+        hashed_tasks = Hashed_Tasks(random_task_list)
+        ordered = [task for (_, task) in hashed_tasks.ordered()]
+
+        assert ordered == random_task_list.order().todos
+
+    def test_delete(self, identity_task, task_cat_x):
+
+        hashed_tasks = Hashed_Tasks(Task_List(todos=[identity_task, task_cat_x]))
+        hashed_tasks._delete(identity_task)
+
+        assert len(hashed_tasks) == 1
+        assert hashed_tasks.categories == ["Cat x"]
+        with pytest.raises(KeyError):
+            hashed_tasks._delete(identity_task)
+
+    def test_measure_memory(self, tmp_path, random_task_list):
+
+        p = tmp_path / ".gitodo"
+        Tasks(path=p, tasks=random_task_list).save()
+
+        tasks, size = measure_memory(p)
+
+        assert len(tasks) == len(random_task_list)
+        assert size > 0
+
+
+class Test_Dependencies:
+    def test_next_tasks(self, empty_tasks, identity_task):
+
+        blocked = Task(
+            name="blocked", desc="desc", blocked_by=[identity_task.to_hash()]
+        )
+        other = Task(name="other", desc="desc", deadline="2021-01-01")
+        empty_tasks.add_task(identity_task)
+        empty_tasks.add_task(blocked)
+        empty_tasks.add_task(other)
+
+        assert empty_tasks.next_tasks().todos == [other, identity_task]
+        assert empty_tasks.next_tasks(limit=1).todos == [other]
+
+        empty_tasks.finish_task(task_name=identity_task.name)
+
+        assert empty_tasks.next_tasks().todos == [other, blocked]
+
+    @pytest.mark.parametrize("build_graph", [True, False])
+    @pytest.mark.parametrize("backend", ["empty_tasks", "sqlite_tasks"])
+    def test_finish_unlinks_dependents(self, request, backend, build_graph):
+
+        tasks = request.getfixturevalue(backend)
+        a = Task(name="a", desc="desc")
+        b = Task(name="b", desc="desc", blocked_by=[a.to_hash()])
+        tasks.add_task(a)
+        tasks.add_task(b)
+        if build_graph:
+            tasks.next_tasks()
+
+        tasks.finish_task(task_name="a")
+        tasks.add_task(Task(name="a", desc="desc"))
+
+        assert tasks.find_task(task_name="b").todos[0].blocked_by == []
+        assert {task.name for task in tasks.next_tasks().todos} == {"a", "b"}
+
+    @pytest.mark.parametrize("backend", ["empty_tasks", "sqlite_tasks"])
+    def test_finish_uses_graph(self, request, monkeypatch, backend):
+
+        tasks = request.getfixturevalue(backend)
+        a = Task(name="a", desc="desc")
+        b = Task(name="b", desc="desc", blocked_by=[a.to_hash()])
+        tasks.add_task(a)
+        tasks.add_task(b)
+        tasks.next_tasks()
+
+        def full_scan(task_hash):
+            raise AssertionError("dependents should come from the graph")
+
+        monkeypatch.setattr(tasks._backend, "dependents", full_scan)
+        tasks.finish_task(task_name="a")
+
+        assert tasks.find_task(task_name="b").todos[0].blocked_by == []
+
+    def test_ready_set(self):
+
+        a = Task(name="a", desc="desc")
+        b = Task(name="b", desc="desc", blocked_by=[a.to_hash()])
+        c = Task(name="c", desc="desc", blocked_by=[a.to_hash(), b.to_hash()])
+        graph = Task_Graph(Task_List(todos=[c, b]))
+
+        assert graph._ready == {b.to_hash()}
+
+        graph.add(a)
+        assert graph._ready == {a.to_hash()}
+
+        graph.remove(a)
+        assert graph._ready == {b.to_hash()}
+
+        graph.remove(b)
+        assert graph._ready == {c.to_hash()}
+        assert [task.name for task in graph.actionable().todos] == ["c"]
+
+    def test_forward_reference(self, empty_tasks, identity_task):
+
+        blocked = Task(
+            name="blocked", desc="desc", blocked_by=[identity_task.to_hash()]
+        )
+        empty_tasks.add_task(blocked)
+        assert empty_tasks.next_tasks().todos == [blocked]
+
+        empty_tasks.add_task(identity_task)
+        assert empty_tasks.next_tasks().todos == [identity_task]
+
+    def test_cycle(self, empty_tasks):
+
+        a = Task(name="a", desc="desc")
+        b = Task(name="b", desc="desc", blocked_by=[a.to_hash()])
+        a_blocked = Task(name="a", desc="desc", blocked_by=[b.to_hash()])
+        empty_tasks.add_task(b)
+
+        with pytest.raises(ValueError):
+            empty_tasks.add_task(a_blocked)
+
+        assert len(empty_tasks) == 1
+
+    def test_sqlite_roundtrip(self, sqlite_tasks, identity_task):
+
+        blocked = Task(
+            name="blocked", desc="desc", blocked_by=[identity_task.to_hash()]
+        )
+        sqlite_tasks.add_task(identity_task)
+        sqlite_tasks.add_task(blocked)
+
+        reloaded = Tasks.from_file(sqlite_tasks.path)
+
+        assert reloaded.find_task(task_name="blocked").todos == [blocked]
+        assert reloaded.next_tasks().todos == [identity_task]
+
+
+@pytest.fixture
+def sqlite_tasks(tmp_path):
+    return Tasks(path=tmp_path / "tasks.db", tasks=Task_List(todos=[]))
+
+
+class Test_Sqlite_Backend:
+    def test_init(self, sqlite_tasks):
+
+        assert isinstance(sqlite_tasks._backend, Sqlite_Backend)
+        assert len(sqlite_tasks) == 0
+
+    def test_add_and_find(self, sqlite_tasks, identity_task, task_cat_x):
+
+        sqlite_tasks.add_task(identity_task)
+        sqlite_tasks.add_task(task_cat_x)
+
+        by_hash = sqlite_tasks.find_task(task_hash=identity_task.to_hash()[:4])
+        by_name = sqlite_tasks.find_task(task_name=task_cat_x.name)
+
+        assert identity_task in by_hash.todos
+        assert by_name.todos == [task_cat_x]
+
+    def test_finish_task(self, sqlite_tasks, identity_task, task_cat_x):
+
+        sqlite_tasks.add_task(identity_task)
+        sqlite_tasks.add_task(task_cat_x)
+
+        sqlite_tasks.finish_task(task_name="name")
+
+        assert sqlite_tasks.to_list() == [task_cat_x]
+
+    def test_page_matches_order(self, sqlite_tasks, random_task_list):
+
+        for task in random_task_list.to_list():
+            sqlite_tasks.add_task(task)
+
+        expected = sqlite_tasks._task_list.order().todos
+
+        assert sqlite_tasks._backend.page().todos == expected
+        assert sqlite_tasks._backend.page(offset=3, limit=4).todos == expected[3:7]
+
+    def test_hash_roundtrip(self, sqlite_tasks):
+
+        task = Task(name="name", desc="desc", cat="")
+        sqlite_tasks.add_task(task)
+
+        reloaded = Tasks.from_file(sqlite_tasks.path).to_list()
+
+        assert [t.to_hash() for t in reloaded] == [task.to_hash()]
+
+    def test_add_many(self, sqlite_tasks, random_task_list):
+
+        sqlite_tasks._backend.add_many(random_task_list.to_list())
+
+        assert sqlite_tasks.to_list() == random_task_list.to_list()
+
+    @pytest.mark.parametrize("cat", [None, "cat", "_"])
+    def test_page_uses_index(self, sqlite_tasks, cat, monkeypatch):
+
+        backend = sqlite_tasks._backend
+        plans = []
+        select = backend._select
+
+        def explain(where="", params=(), suffix=""):
+            query = f"SELECT name FROM tasks {'WHERE ' + where if where else ''}"
+            rows = backend._connection.execute(
+                f"EXPLAIN QUERY PLAN {query} {suffix}", params
+            )
+            plans.extend(row[3] for row in rows)
+            return select(where, params, suffix)
+
+        monkeypatch.setattr(backend, "_select", explain)
+        backend.page(offset=1, limit=2, cat=cat)
+
+        assert any("INDEX tasks_" in plan for plan in plans)
+        assert not any("TEMP B-TREE" in plan for plan in plans)
+
+    def test_categories(self, sqlite_tasks, identity_task):
+
+        sqlite_tasks.add_task(identity_task)
+        sqlite_tasks.add_task(Task(**random_task_no_cat()))
+
+        assert sqlite_tasks._backend.categories() == ["cat", "_"]
+
+    def test_migrate(self, tmp_path, random_task_list):
+
+        json_tasks = Tasks(path=tmp_path / ".gitodo", tasks=random_task_list)
+        json_tasks.save()
+
+        sqlite_tasks = Tasks.from_file(json_tasks.path).migrate(tmp_path / "t.db")
+        reloaded = Tasks.from_file(tmp_path / "t.db")
+        back = reloaded.migrate(tmp_path / ".gitodo.back")
+
+        expected = {task.to_hash() for task in random_task_list.to_list()}
+        assert {task.to_hash() for task in sqlite_tasks.to_list()} == expected
+        assert {task.to_hash() for task in back.to_list()} == expected
+
+    def test_migrate_existing_destination(self, tmp_path, identity_task):
+
+        json_tasks = Tasks(path=tmp_path / ".gitodo", tasks=Task_List(todos=[]))
+        json_tasks.add_task(identity_task)
+        json_tasks.migrate(tmp_path / "t.db")
+
+        with pytest.raises(FileExistsError):
+            json_tasks.migrate(tmp_path / "t.db")
+
+
+class Test_Compression:
+    @pytest.mark.parametrize("suffix", [".gz", ".xz"])
+    def test_save_and_load(self, tmp_path, random_task_list, suffix):
+
+        p = tmp_path / f".gitodo{suffix}"
+        Tasks(path=p, tasks=random_task_list).save()
+
+        t_reload = Tasks.from_file(p)
+
+        assert p.read_bytes()[:1] != b"{"
+        assert t_reload.to_list() == random_task_list.order().to_list()
+
+    def test_gzip_is_reproducible(self, tmp_path, random_task_list):
+
+        first = tmp_path / ".gitodo.gz"
+        second = tmp_path / "other" / "tasks.gz"
+        Tasks(path=first, tasks=random_task_list).save()
+        Tasks(path=second, tasks=random_task_list).save()
+
+        # no file name and a zero modification time in the header
+        assert first.read_bytes() == second.read_bytes()
+        assert first.read_bytes()[4:8] == b"\x00\x00\x00\x00"
+
+    def test_detect_by_magic_bytes(self, tmp_path, random_task_list):
+
+        compressed = tmp_path / ".gitodo.gz"
+        Tasks(path=compressed, tasks=random_task_list).save()
+        p = tmp_path / ".gitodo"
+        compressed.rename(p)
+
+        with Tasks.from_file(p) as tasks:
+            assert len(tasks) == len(random_task_list)
+
+        assert gzip.decompress(p.read_bytes())
+
+
+class Test_Completion:
+    def test_save_writes_index(self, tmp_path, identity_task, task_cat_x):
+
+        t = Tasks(path=tmp_path / ".gitodo", tasks=Task_List(todos=[identity_task]))
+        t.add_task(task_cat_x)
+        t.save()
+
+        index = json.loads(completion_index_path(t.path).read_text())
+
+        assert index["hashes"] == sorted(
+            [identity_task.to_hash(), task_cat_x.to_hash()]
+        )
+        assert index["names"] == sorted([identity_task.name, task_cat_x.name])
+        assert index["cats"] == ["Cat x", "cat"]
+
+    def test_complete(self, tmp_path, monkeypatch, identity_task):
+
+        monkeypatch.chdir(tmp_path)
+        Tasks(tasks=Task_List(todos=[identity_task])).save()
+
+        ctx = click.Context(click.Command("gitodo"))
+
+        assert complete_hash(ctx, identity_task.to_hash()[:3]) == [
+            identity_task.to_hash()
+        ]
+        assert complete_cat(ctx, "c") == ["cat"]
+        assert complete_cat(ctx, "x") == []
+
+    def test_sqlite_candidates(self, sqlite_tasks, identity_task):
+
+        sqlite_tasks.add_task(identity_task)
+        sqlite_tasks.add_task(Task(**random_task_no_cat()))
+
+        hashes, names, cats = sqlite_tasks._backend.completion_candidates()
+
+        assert identity_task.to_hash() in hashes
+        assert identity_task.name in names
+        assert cats == ["cat"]
+
+    def test_complete_without_index(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+
+        assert complete_hash(click.Context(click.Command("gitodo")), "") == []
+
+    def test_find_task_file(self, tmp_path, monkeypatch):
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv(TASKS_FILE_ENV, raising=False)
+        assert find_task_file() == TASKS_PATH
+
+        Path(".gitodo.db").touch()
+        Path(".gitodo.gz").touch()
+        assert find_task_file() == Path(".gitodo.gz")
+
+        monkeypatch.setenv(TASKS_FILE_ENV, "tasks.xz")
+        assert find_task_file() == Path("tasks.xz")
+        assert find_task_file("other") == Path("other")